@@ -1,17 +1,23 @@
 # -*- coding: utf-8 -*-
 
 
-from __future__ import absolute_import, division, print_function
-
 import asyncio
+from collections import OrderedDict
+import concurrent.futures
+from functools import lru_cache
 from glob import has_magic
+import hashlib
 import io
 import logging
 import os
 import warnings
 import weakref
 
-from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceNotFoundError,
+    ResourceExistsError,
+)
 from azure.storage.blob._shared.base_client import create_configuration
 from azure.datalake.store import AzureDLFileSystem, lib
 from azure.datalake.store.core import AzureDLFile, AzureDLPath
@@ -55,6 +61,18 @@ FORWARDED_BLOB_PROPERTIES = [
     "tag_count",
 ]
 _ROOT_PATH = "/"
+# Maximum number of subrequests the Blob Batch API accepts in one request
+_MAX_BATCH_SIZE = 256
+# Status codes of a Blob Batch request on an account or emulator without
+# support for it, as opposed to failures such as auth errors or throttling
+_BATCH_UNSUPPORTED_STATUS = {400, 405, 409, 501}
+# Byte ranges larger than this are read by cat_file as concurrent downloads of
+# this size
+MIN_CHUNK_SIZE_FOR_CONCURRENCY = 5 * 2 ** 20
+# Datalake Gen1 credentials, keyed by (tenant_id, client_id, sha256(client_secret)).
+# The credentials refresh their own token before it expires, so they can be shared
+# by every filesystem instance in the process.
+_TOKEN_CACHE = {}
 
 
 class AzureDatalakeFileSystem(AbstractFileSystem):
@@ -127,12 +145,25 @@ class AzureDatalakeFileSystem(AbstractFileSystem):
         return ops["path"]
 
     def do_connect(self):
-        """Establish connection object."""
-        token = lib.auth(
-            tenant_id=self.tenant_id,
-            client_id=self.client_id,
-            client_secret=self.client_secret,
+        """Establish connection object.
+
+        The OAuth token is cached per set of credentials, so reconnecting (for
+        example when the filesystem is unpickled on a dask worker) does not
+        request a new one.
+        """
+        key = (
+            self.tenant_id,
+            self.client_id,
+            hashlib.sha256((self.client_secret or "").encode()).hexdigest(),
         )
+        token = _TOKEN_CACHE.get(key)
+        if token is None:
+            token = lib.auth(
+                tenant_id=self.tenant_id,
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+            )
+            _TOKEN_CACHE[key] = token
         self.azure_fs = AzureDLFileSystem(token=token, store_name=self.store_name)
 
     def ls(self, path, detail=False, invalidate_cache=True, **kwargs):
@@ -293,8 +324,9 @@ class AzureBlobFileSystem(AsyncFileSystem):
         instead of the account key. If account key and sas token are both
         specified, account key will be used to sign. If any of account key, sas token
         or client_id are specified, anonymous access will be used.
-    request_session: Session
-        The session object to use for http requests.
+    request_session: aiohttp.ClientSession
+        The session object to use for http requests.  It is shared by all clients
+        created by this filesystem so that connections are pooled and reused.
     connection_string: str
         If specified, this will override all other parameters besides
         request session. See
@@ -321,6 +353,12 @@ class AzureBlobFileSystem(AsyncFileSystem):
     default_cache_type: string ('bytes')
         If given, the default cache_type value used for "open()".  Set to none if no caching
         is desired.  Docs in fsspec
+    max_concurrency: int (8)
+        The maximum number of requests run at the same time by ``cat``, ``cat_file``
+        and ``cat_ranges`` downloads, by the directory listings of ``glob`` and the
+        lookups of ``bulk_info``, and by the background block uploads of each file
+        opened in "wb" mode. ``find`` and ``ls`` are single listings and are not
+        affected
 
     Pass on to fsspec:
 
@@ -374,8 +412,13 @@ class AzureBlobFileSystem(AsyncFileSystem):
         asynchronous: bool = False,
         default_fill_cache: bool = True,
         default_cache_type: str = "bytes",
+        max_concurrency: int = 8,
         **kwargs,
     ):
+        if max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency must be at least 1, got {max_concurrency}"
+            )
         super_kwargs = {
             k: kwargs.pop(k)
             for k in ["use_listings_cache", "listings_expiry_time", "max_paths"]
@@ -398,6 +441,8 @@ class AzureBlobFileSystem(AsyncFileSystem):
         self.blocksize = blocksize
         self.default_fill_cache = default_fill_cache
         self.default_cache_type = default_cache_type
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
         if (
             self.credential is None
             and self.account_key is None
@@ -414,10 +459,14 @@ class AzureBlobFileSystem(AsyncFileSystem):
         weakref.finalize(self, sync, self.loop, close_service_client, self)
 
     @classmethod
+    @lru_cache(maxsize=4096)
     def _strip_protocol(cls, path: str):
         """
         Remove the protocol from the input path
 
+        This is called for every path handled by the filesystem, so results are
+        cached, and paths without a protocol skip the URL parsing entirely.
+
         Parameters
         ----------
         path: str
@@ -428,6 +477,8 @@ class AzureBlobFileSystem(AsyncFileSystem):
         str
             Returns a path without the protocol
         """
+        if "://" not in path:
+            return path.lstrip("/")
         logger.debug(f"_strip_protocol for {path}")
         ops = infer_storage_options(path)
 
@@ -469,6 +520,23 @@ class AzureBlobFileSystem(AsyncFileSystem):
 
         return (async_credential, sync_credential)
 
+    def _get_transport_kwargs(self):
+        """
+        Keyword arguments passed on to the transport of every BlobServiceClient.
+
+        When a ``request_session`` is given, all clients send their requests
+        through it, so its connection pool is reused instead of each client
+        opening (and tearing down) its own connections.  The session is owned
+        by the caller and is not closed by adlfs.
+
+        Returns
+        -------
+        dict
+        """
+        if self.request_session is None:
+            return {}
+        return {"session": self.request_session, "session_owner": False}
+
     def do_connect(self):
         """Connect to the BlobServiceClient, using user-specified connection details.
         Tries credentials first, then connection string and finally account key
@@ -477,10 +545,12 @@ class AzureBlobFileSystem(AsyncFileSystem):
         ------
         ValueError if none of the connection details are available
         """
+        client_kwargs = self._get_transport_kwargs()
+        self._container_clients = {}
         try:
             if self.connection_string is not None:
                 self.service_client = AIOBlobServiceClient.from_connection_string(
-                    conn_str=self.connection_string
+                    conn_str=self.connection_string, **client_kwargs
                 )
             elif self.account_name:
                 self.account_url: str = f"https://{self.account_name}.blob.core.windows.net"
@@ -491,6 +561,7 @@ class AzureBlobFileSystem(AsyncFileSystem):
                             account_url=self.account_url,
                             credential=cred,
                             _location_mode=self.location_mode,
+                            **client_kwargs,
                         )
                         for cred in creds
                         if cred is not None
@@ -502,10 +573,11 @@ class AzureBlobFileSystem(AsyncFileSystem):
                         account_url=self.account_url + self.sas_token,
                         credential=None,
                         _location_mode=self.location_mode,
+                        **client_kwargs,
                     )
                 else:
                     self.service_client = AIOBlobServiceClient(
-                        account_url=self.account_url
+                        account_url=self.account_url, **client_kwargs
                     )
             else:
                 raise ValueError(
@@ -515,6 +587,31 @@ class AzureBlobFileSystem(AsyncFileSystem):
         except Exception as e:
             raise ValueError(f"unable to connect to account for {e}")
 
+    def _get_container_client(self, container_name: str):
+        """
+        Return the ContainerClient for container_name, created once per container
+
+        Building a client sets up a new pipeline and parses the account url, so
+        the clients are kept for the lifetime of the service client rather than
+        rebuilt for every request.  They share the service client's transport,
+        and closing one of them does not close that transport.
+
+        Parameters
+        ----------
+        container_name: str
+            Name of the container
+
+        Returns
+        -------
+        ContainerClient
+        """
+        try:
+            return self._container_clients[container_name]
+        except KeyError:
+            cc = self.service_client.get_container_client(container_name)
+            self._container_clients[container_name] = cc
+            return cc
+
     def split_path(self, path, delimiter="/", return_container: bool = False, **kwargs):
         """
         Normalize ABFS path string into bucket and key.
@@ -591,6 +688,60 @@ class AzureBlobFileSystem(AsyncFileSystem):
         else:
             raise FileNotFoundError
 
+    async def _info_many(self, paths, refresh=False):
+        """Give details of many entries, grouping them by their parent
+
+        Each parent directory is listed once, and the listings are fetched
+        concurrently, so that looking up the details of N files in the same
+        directory costs a single request instead of N. The listings are kept
+        in the directory cache for later single path lookups.
+
+        Parameters
+        ----------
+        paths: list of str
+            The entries to look up
+        refresh: bool
+            If True, do not use the cached listings
+
+        Returns
+        -------
+        dict mapping each of the paths to the same dictionary ``info()``
+        would return for it
+        """
+        stripped = {path: self._strip_protocol(path).rstrip("/") for path in paths}
+        parents = {self._parent(path) for path in stripped.values()}
+        if refresh:
+            for parent in parents:
+                self.invalidate_cache(parent or _ROOT_PATH)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _listing(p):
+            async with semaphore:
+                try:
+                    return await self._ls(p)
+                except (FileNotFoundError, IOError):
+                    return []
+
+        async def _lookup(p):
+            async with semaphore:
+                return await self._info(p)
+
+        listings = await asyncio.gather(*[_listing(p) for p in parents])
+        found = {}
+        for listing in listings:
+            for entry in listing:
+                found.setdefault(entry["name"].rstrip("/"), entry)
+
+        # Entries missing from their parent listing, such as containers or
+        # directories without a marker blob, are looked up one by one, with
+        # the same bound on the requests in flight
+        missing = [path for path in set(stripped.values()) if path not in found]
+        infos = await asyncio.gather(*[_lookup(path) for path in missing])
+        found.update(zip(missing, infos))
+        return {path: found[name] for path, name in stripped.items()}
+
+    bulk_info = sync_wrapper(_info_many)
+
     def glob(self, path, **kwargs):
         return sync(self.loop, self._glob, path)
 
@@ -690,7 +841,7 @@ class AzureBlobFileSystem(AsyncFileSystem):
         if detail:
             return files
         else:
-            return list(sorted(set([f["name"] for f in files])))
+            return sorted({f["name"] for f in files})
 
     async def _ls(
         self,
@@ -742,9 +893,7 @@ class AzureBlobFileSystem(AsyncFileSystem):
             if target_path not in self.dircache or invalidate_cache or return_glob:
                 if container not in ["", delimiter]:
                     # This is the case where the container name is passed
-                    async with self.service_client.get_container_client(
-                        container=container
-                    ) as cc:
+                    async with self._get_container_client(container) as cc:
                         path = path.strip("/")
                         blobs = cc.walk_blobs(
                             include=["metadata"], name_starts_with=path
@@ -793,7 +942,6 @@ class AzureBlobFileSystem(AsyncFileSystem):
                     )
                     if return_glob:
                         return finalblobs
-                    finalblobs = await self._details(outblobs, target_path=target_path)
                     if not finalblobs:
                         if not await self._exists(target_path):
                             raise FileNotFoundError
@@ -829,44 +977,34 @@ class AzureBlobFileSystem(AsyncFileSystem):
         """
         output = []
         for content in contents:
+            has_key = content.has_key
             data = {
-                key: content[key]
-                for key in FORWARDED_BLOB_PROPERTIES
-                if content.has_key(key)  # NOQA
+                key: content[key] for key in FORWARDED_BLOB_PROPERTIES if has_key(key)
             }
-            if content.has_key("container"):  # NOQA
-                fname = f"{content.container}{delimiter}{content.name}"
-                fname = fname.rstrip(delimiter)
-                if content.has_key("size"):  # NOQA
-                    data.update({"name": fname})
-                    data.update({"size": content.size})
-                    data.update({"type": "file"})
+            if has_key("container"):
+                data["name"] = f"{content.container}{delimiter}{content.name}".rstrip(
+                    delimiter
+                )
+                if has_key("size"):
+                    data["size"] = content.size
+                    data["type"] = "file"
                 else:
-                    data.update({"name": fname})
-                    data.update({"size": None})
-                    data.update({"type": "directory"})
+                    data["size"] = None
+                    data["type"] = "directory"
             else:
-                fname = f"{content.name}"
-                data.update({"name": fname})
-                data.update({"size": None})
-                data.update({"type": "directory"})
-            if "metadata" in data.keys():
-                if data["metadata"] is not None:
-                    if (
-                        "is_directory" in data["metadata"].keys()
-                        and data["metadata"]["is_directory"] == "true"
-                    ):
-                        data.update({"type": "directory"})
-                        data.update({"size": None})
-                    elif (
-                        "is_directory" in data["metadata"].keys()
-                        and data["metadata"]["is_directory"] == "false"
-                    ):
-                        data.update({"type": "file"})
-                    else:
-                        pass
+                data["name"] = f"{content.name}"
+                data["size"] = None
+                data["type"] = "directory"
+            metadata = data.get("metadata")
+            if metadata:
+                is_directory = metadata.get("is_directory")
+                if is_directory == "true":
+                    data["type"] = "directory"
+                    data["size"] = None
+                elif is_directory == "false":
+                    data["type"] = "file"
             if return_glob:
-                data.update({"name": data["name"].rstrip("/")})
+                data["name"] = data["name"].rstrip("/")
             output.append(data)
         if target_path:
             if len(output) == 1 and output[0]["type"] == "file":
@@ -900,9 +1038,7 @@ class AzureBlobFileSystem(AsyncFileSystem):
         target_path = f"{parent_path}{(prefix or '').lstrip('/')}"
         container, path = self.split_path(target_path)
 
-        async with self.service_client.get_container_client(
-            container=container
-        ) as container_client:
+        async with self._get_container_client(container) as container_client:
             blobs = container_client.list_blobs(
                 include=["metadata"], name_starts_with=path
             )
@@ -958,15 +1094,37 @@ class AzureBlobFileSystem(AsyncFileSystem):
         path = self._strip_protocol(path)
         out = dict()
         detail = kwargs.pop("detail", False)
-        async for path, dirs, files in self._async_walk(
-            path, maxdepth, detail=True, **kwargs
-        ):
-            if files == []:
-                files = {}
-                dirs = {}
-            if withdirs:
-                files.update(dirs)
-            out.update({info["name"]: info for name, info in files.items()})
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _listing(p):
+            async with semaphore:
+                try:
+                    return await self._ls(p, return_glob=True, **kwargs)
+                except (FileNotFoundError, IOError):
+                    return []
+
+        # Walk the tree one level at a time, listing all of the directories
+        # found on a level concurrently instead of one after the other
+        level = [path]
+        depth = maxdepth
+        while level:
+            listings = await asyncio.gather(*[_listing(p) for p in level])
+            subdirs = {}
+            for p, listing in zip(level, listings):
+                for info in listing:
+                    pathname = info["name"].rstrip("/")
+                    if info["type"] == "directory" and pathname != p:
+                        # do not include "self" path
+                        subdirs[pathname] = None
+                        if withdirs:
+                            out[info["name"]] = info
+                    else:
+                        out[info["name"]] = info
+            if depth is not None:
+                depth -= 1
+                if depth < 1:
+                    break
+            level = list(subdirs)
         if await self._isfile(path) and path not in out:
             # walk works on directories, but find should also return [path]
             # when path happens to be a file
@@ -1046,9 +1204,7 @@ class AzureBlobFileSystem(AsyncFileSystem):
 
     async def _container_exists(self, container_name):
         try:
-            async with self.service_client.get_container_client(
-                container_name
-            ) as client:
+            async with self._get_container_client(container_name) as client:
                 await client.get_container_properties()
         except ResourceNotFoundError:
             return False
@@ -1133,12 +1289,125 @@ class AzureBlobFileSystem(AsyncFileSystem):
         path = await self._expand_path(
             path, recursive=recursive, maxdepth=maxdepth, with_parent=True
         )
+        blobs = {}
+        containers = []
         for p in reversed(path):
-            await self._rm_file(p)
-        self.invalidate_cache()
+            container_name, blob = self.split_path(p)
+            if blob:
+                blobs.setdefault(container_name, {})[blob.rstrip("/")] = None
+            else:
+                containers.append(container_name)
+        for container_name, names in blobs.items():
+            await self._delete_blobs(container_name, list(names))
+        for container_name in containers:
+            await self._rmdir(container_name)
+        self.invalidate_for_write(path, delete=True)
 
     rm = sync_wrapper(_rm)
 
+    async def _batch_chunks(self, container_name, blobs, operation):
+        """
+        Run a Blob Batch operation over ``blobs``, in chunks of at most
+        ``_MAX_BATCH_SIZE`` subrequests, and return the failed subrequests
+
+        Parameters
+        ----------
+        container_name: str
+            Container holding all of the blobs
+
+        blobs: list of str
+            Blob names, relative to the container
+
+        operation: callable
+            Called as ``operation(container_client, *chunk)`` and returns the
+            async iterator of subresponses from the batch call
+
+        Returns
+        -------
+        List of (blob name, status code) for subrequests that did not succeed
+        """
+        failed = []
+        async with self._get_container_client(container_name) as cc:
+            for i in range(0, len(blobs), _MAX_BATCH_SIZE):
+                chunk = blobs[i : i + _MAX_BATCH_SIZE]
+                responses = await operation(cc, *chunk)
+                j = 0
+                async for response in responses:
+                    if not 200 <= response.status_code < 300:
+                        failed.append((chunk[j], response.status_code))
+                    j += 1
+        return failed
+
+    async def _delete_blobs(self, container_name, blobs):
+        """
+        Delete blobs from a container, with one Blob Batch request per
+        ``_MAX_BATCH_SIZE`` blobs.  Blobs that do not exist are ignored.
+
+        Accounts that do not support the Blob Batch API (such as accounts with a
+        hierarchical namespace) fall back to deleting the blobs one by one. Any
+        other failure of a batch request is raised.
+
+        Parameters
+        ----------
+        container_name: str
+            Container holding all of the blobs
+
+        blobs: list of str
+            Blob names, relative to the container
+        """
+        try:
+            failed = await self._batch_chunks(
+                container_name,
+                blobs,
+                lambda cc, *chunk: cc.delete_blobs(*chunk, raise_on_any_failure=False),
+            )
+        except ResourceNotFoundError:
+            return
+        except HttpResponseError as e:
+            if e.status_code not in _BATCH_UNSUPPORTED_STATUS:
+                raise
+            for blob in blobs:
+                await self._rm_file(f"{container_name}/{blob}")
+            return
+        failed = [(blob, status) for blob, status in failed if status != 404]
+        if failed:
+            raise RuntimeError(f"Failed to remove {failed}")
+
+    async def _set_tier(self, path, tier: str):
+        """
+        Set the access tier of one or more block blobs, with one Blob Batch
+        request per ``_MAX_BATCH_SIZE`` blobs in each container
+
+        Parameters
+        ----------
+        path: str or list of str
+            Blob(s) to set the tier of
+
+        tier: str
+            One of "Hot", "Cool" or "Archive"
+        """
+        if isinstance(path, str):
+            path = [path]
+        blobs = {}
+        for p in path:
+            container_name, blob = self.split_path(p)
+            blobs.setdefault(container_name, []).append(blob)
+        for container_name, names in blobs.items():
+            try:
+                failed = await self._batch_chunks(
+                    container_name,
+                    names,
+                    lambda cc, *chunk: cc.set_standard_blob_tier_blobs(
+                        tier, *chunk, raise_on_any_failure=False
+                    ),
+                )
+            except ResourceNotFoundError as e:
+                raise FileNotFoundError(f"Container not found for {e}") from e
+            if failed:
+                raise RuntimeError(f"Failed to set the tier of {failed}")
+
+    set_tier = sync_wrapper(_set_tier)
+
     async def _rm_file(self, path, delimiter="/", **kwargs):
         """
         Delete a given file
@@ -1151,14 +1420,13 @@ class AzureBlobFileSystem(AsyncFileSystem):
         delimiter: str
             Delimiter to use when splitting the path
         """
+        fullpath = path
         try:
             kind = await self._info(path)
             container_name, path = self.split_path(path, delimiter=delimiter)
             kind = kind["type"]
             if path != "":
-                async with self.service_client.get_container_client(
-                    container=container_name
-                ) as cc:
+                async with self._get_container_client(container_name) as cc:
                     await cc.delete_blob(path.rstrip(delimiter))
             elif kind == "directory":
                 await self._rmdir(container_name)
@@ -1171,7 +1439,7 @@ class AzureBlobFileSystem(AsyncFileSystem):
         except Exception as e:
             raise RuntimeError(f"Failed to remove {path} for {e}")
 
-        self.invalidate_cache(self._parent(path))
+        self.invalidate_for_write(fullpath, delete=True)
 
     sync_wrapper(_rm_file)
 
@@ -1207,6 +1475,11 @@ class AzureBlobFileSystem(AsyncFileSystem):
         size = res.get("size", None)
         return size
 
+    def sizes(self, paths):
+        """Size in bytes of each of the files, in the order of paths"""
+        infos = self.bulk_info(paths)
+        return [infos[path].get("size", None) for path in paths]
+
     def isfile(self, path):
         return sync(self.loop, self._isfile, path)
 
@@ -1273,18 +1546,116 @@ class AzureBlobFileSystem(AsyncFileSystem):
 
     async def _pipe_file(self, path, value, overwrite=True, **kwargs):
         """Set the bytes of given file"""
-        container_name, path = self.split_path(path)
+        container_name, blob = self.split_path(path)
         async with self.service_client.get_blob_client(
-            container=container_name, blob=path
+            container=container_name, blob=blob
         ) as bc:
             result = await bc.upload_blob(
                 data=value, overwrite=overwrite, metadata={"is_directory": "false"}
             )
-        self.invalidate_cache(self._parent(path))
+        self.invalidate_for_write(path)
         return result
 
     pipe_file = sync_wrapper(_pipe_file)
 
+    def _get_semaphore(self):
+        """
+        The semaphore bounding concurrent downloads to ``max_concurrency``.
+        Created on first use, so that it belongs to the running event loop.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _cat_file(self, path, start=None, end=None, **kwargs):
+        """
+        Get the content of a file, or of the byte range ``[start, end)`` of it.
+
+        Ranges larger than ``MIN_CHUNK_SIZE_FOR_CONCURRENCY`` are split into
+        chunks of that size, which are downloaded concurrently.
+
+        Parameters
+        ----------
+        path: str
+            Path to the file
+
+        start: int
+            Byte position to start reading from. Defaults to the start of the file
+
+        end: int
+            Byte position to stop reading at. Defaults to the end of the file
+        """
+        path = self._strip_protocol(path)
+        container_name, path = self.split_path(path)
+        if start is None and end is not None:
+            start = 0
+        if end is not None:
+            if end <= start:
+                return b""
+            length = end - start
+            if length > MIN_CHUNK_SIZE_FOR_CONCURRENCY:
+                offsets = list(range(start, end, MIN_CHUNK_SIZE_FOR_CONCURRENCY))
+                chunks = await asyncio.gather(
+                    *[
+                        self._cat_file(
+                            f"{container_name}/{path}",
+                            start=offset,
+                            end=min(offset + MIN_CHUNK_SIZE_FOR_CONCURRENCY, end),
+                        )
+                        for offset in offsets
+                    ]
+                )
+                return b"".join(chunks)
+        else:
+            length = None
+        async with self._get_semaphore():
+            async with self.service_client.get_blob_client(
+                container=container_name, blob=path
+            ) as bc:
+                try:
+                    # Without a range (offset=None) the SDK can also download
+                    # empty blobs, which reject any range request
+                    stream = await bc.download_blob(offset=start, length=length)
+                except ResourceNotFoundError as e:
+                    raise FileNotFoundError(f"File not found for {e}") from e
+                except HttpResponseError as e:
+                    if e.status_code == 416:
+                        # The range starts at or past the end of the blob
+                        return b""
+                    raise
+                result = await stream.readall()
+        return result
+
+    async def _cat_ranges(self, paths, starts, ends, **kwargs):
+        """
+        Get the contents of byte ranges of one or more files concurrently
+
+        Parameters
+        ----------
+        paths: list of str
+            The file to read each range from
+
+        starts: list of int
+            Start byte position of each range
+
+        ends: list of int
+            End byte position (exclusive) of each range
+
+        Returns
+        -------
+        List of bytes, in the same order as the requested ranges
+        """
+        if not len(paths) == len(starts) == len(ends):
+            raise ValueError("paths, starts and ends must have the same length")
+        return await asyncio.gather(
+            *[
+                self._cat_file(path, start=start, end=end, **kwargs)
+                for path, start, end in zip(paths, starts, ends)
+            ]
+        )
+
+    cat_ranges = sync_wrapper(_cat_ranges)
+
     def cat(self, path, recursive=False, on_error="raise", **kwargs):
         """Fetch (potentially multiple) paths' contents
         Returns a dict of {path: contents} if there are multiple paths
@@ -1295,25 +1666,17 @@ class AzureBlobFileSystem(AsyncFileSystem):
             will simply not be included in the output; if "return", all keys are
             included in the output, but the value will be bytes or an exception
             instance.
+
+        The files are downloaded concurrently, at most ``max_concurrency`` at a time.
         """
-        paths = self.expand_path(path, recursive=recursive)
-        if (
-            len(paths) > 1
-            or isinstance(path, list)
-            or paths[0] != self._strip_protocol(path)
-        ):
-            out = {}
-            for path in paths:
-                try:
-                    out[path] = self.cat_file(path, **kwargs)
-                except Exception as e:
-                    if on_error == "raise":
-                        raise
-                    if on_error == "return":
-                        out[path] = e
-            return out
-        else:
-            return self.cat_file(paths[0])
+        return sync(
+            self.loop,
+            self._cat,
+            path,
+            recursive=recursive,
+            on_error=on_error,
+            **kwargs,
+        )
 
     def url(self, path, expires=3600, **kwargs):
         return sync(self.loop, self._url, path, expires, **kwargs)
@@ -1418,32 +1781,31 @@ class AzureBlobFileSystem(AsyncFileSystem):
                         await bc.upload_blob(
                             f1, overwrite=overwrite, metadata={"is_directory": "false"}
                         )
-                self.invalidate_cache()
+                self.invalidate_for_write(rpath)
             except ResourceExistsError:
                 raise FileExistsError("File already exists!")
             except ResourceNotFoundError:
                 if not await self._exists(container_name):
                     raise FileNotFoundError("Container does not exist.")
                 await self._put_file(lpath, rpath, delimiter, overwrite)
-                self.invalidate_cache()
 
     put_file = sync_wrapper(_put_file)
 
     async def _cp_file(self, path1, path2, **kwargs):
         """ Copy the file at path1 to path2 """
+        fullpath2 = path2
         container1, path1 = self.split_path(path1, delimiter="/")
         container2, path2 = self.split_path(path2, delimiter="/")
 
-        cc1 = self.service_client.get_container_client(container1)
+        cc1 = self._get_container_client(container1)
         blobclient1 = cc1.get_blob_client(blob=path1)
         if container1 == container2:
             blobclient2 = cc1.get_blob_client(blob=path2)
         else:
-            cc2 = self.service_client.get_container_client(container2)
+            cc2 = self._get_container_client(container2)
             blobclient2 = cc2.get_blob_client(blob=path2)
         await blobclient2.start_copy_from_url(blobclient1.url)
-        self.invalidate_cache(container1)
-        self.invalidate_cache(container2)
+        self.invalidate_for_write(fullpath2)
 
     cp_file = sync_wrapper(_cp_file)
 
@@ -1469,8 +1831,9 @@ class AzureBlobFileSystem(AsyncFileSystem):
                 ) as bc:
                     with open(lpath, "wb") as my_blob:
                         stream = await bc.download_blob()
-                        data = await stream.readall()
-                        my_blob.write(data)
+                        # Write each downloaded chunk straight to the file rather
+                        # than holding the whole blob in memory first
+                        await stream.readinto(my_blob)
         except Exception as e:
             raise FileNotFoundError(f"File not found for {e}")
 
@@ -1485,7 +1848,7 @@ class AzureBlobFileSystem(AsyncFileSystem):
         try:
             async with self.service_client.get_blob_client(container_name, path) as bc:
                 await bc.set_blob_metadata(metadata=kwargs)
-            self.invalidate_cache(self._parent(rpath))
+            self.invalidate_for_write(rpath)
         except Exception as e:
             raise FileNotFoundError(f"File not found for {e}")
 
@@ -1498,6 +1861,54 @@ class AzureBlobFileSystem(AsyncFileSystem):
             self.dircache.pop(path, None)
         super(AzureBlobFileSystem, self).invalidate_cache(path)
 
+    def invalidate_for_write(self, path, delete: bool = False):
+        """
+        Drop the cached listings that a write to path can make stale, and keep
+        the others
+
+        A listing is affected if it is the listing of path itself or of
+        anything below it, if it is the listing of the parent of path, or if it
+        is the listing of a further ancestor that does not yet contain the
+        (virtual) directory leading to path.  When path was deleted, every
+        ancestor is affected, since the virtual directories leading to path may
+        have disappeared with it.
+
+        Parameters
+        ----------
+        path: str or list of str
+            The file(s) or directories that were written or removed
+        delete: bool
+            Whether the paths were removed rather than written
+        """
+        if isinstance(path, str):
+            path = [path]
+        paths = {self._strip_protocol(p).rstrip("/") for p in path}
+
+        # Iterate over the raw keys, since iterating over the DirCache itself
+        # drops expired listings from the dict being iterated over
+        for key in list(self.dircache._cache):
+            parts = key.split("/")
+            if any("/".join(parts[:i]) in paths for i in range(1, len(parts) + 1)):
+                self.dircache.pop(key, None)
+
+        stale = set()
+        for p in paths:
+            parts = p.split("/")
+            stale.add("/".join(parts[:-1]) or _ROOT_PATH)
+            for i in range(len(parts) - 2, -1, -1):
+                ancestor = "/".join(parts[:i]) or _ROOT_PATH
+                if delete:
+                    stale.add(ancestor)
+                    continue
+                listing = self.dircache.get(ancestor)
+                if listing is None:
+                    continue
+                child = "/".join(parts[: i + 1])
+                if not any(entry["name"].rstrip("/") == child for entry in listing):
+                    stale.add(ancestor)
+        for key in stale:
+            self.dircache.pop(key, None)
+
     def _open(
         self,
         path: str,
@@ -1545,6 +1956,104 @@ class AzureBlobFileSystem(AsyncFileSystem):
         )
 
 
+class BackgroundPrefetcher:
+    """
+    Read ahead of a sequential reader by fetching the following blocks in the
+    background on the event loop.
+
+    A call to ``fetch`` whose ``start`` matches the ``end`` of the previous call
+    is treated as part of a sequential streak.  After two sequential calls in a
+    row, one block is scheduled for download past the end of the read, and the
+    window doubles with every further sequential call, up to ``nblocks``
+    blocks.  Any other call is treated as a seek, and the outstanding blocks
+    are dropped and the window starts again from nothing.
+
+    Parameters
+    ----------
+    fetcher: coroutine function
+        Called as ``fetcher(start, end)`` to download a byte range
+    loop: asyncio event loop
+        The loop the downloads are scheduled on
+    blocksize: int
+        Size of each prefetched block
+    size: int
+        Size of the file, no block is fetched beyond it
+    nblocks: int
+        Maximum number of blocks to keep in flight ahead of the reader
+    """
+
+    def __init__(self, fetcher, loop, blocksize: int, size: int, nblocks: int = 8):
+        self.fetcher = fetcher
+        self.loop = loop
+        self.blocksize = blocksize
+        self.size = size
+        self.nblocks = nblocks
+        # block start -> (block end, concurrent.futures.Future)
+        self.blocks = OrderedDict()
+        self.last_end = None
+        self.next_start = None
+        self.streak = 0
+
+    def _submit(self, start: int, end: int):
+        future = asyncio.run_coroutine_threadsafe(self.fetcher(start, end), self.loop)
+        self.blocks[start] = (end, future)
+
+    def _window(self) -> int:
+        """Number of blocks to keep in flight for the current streak"""
+        if self.streak < 2:
+            return 0
+        return min(self.nblocks, 2 ** (self.streak - 2))
+
+    def _schedule(self, end: int):
+        """Keep the window of blocks in flight past ``end``"""
+        if self.next_start is None or self.next_start < end:
+            self.next_start = end
+        window = self._window()
+        while len(self.blocks) < window and self.next_start < self.size:
+            block_end = min(self.next_start + self.blocksize, self.size)
+            self._submit(self.next_start, block_end)
+            self.next_start = block_end
+
+    def clear(self):
+        """Cancel all outstanding blocks"""
+        for _, future in self.blocks.values():
+            future.cancel()
+        self.blocks.clear()
+        self.next_start = None
+
+    def fetch(self, start: int, end: int):
+        """Return the bytes in ``[start, end)``, served from prefetched blocks if possible"""
+        end = min(end, self.size)
+        sequential = start == self.last_end
+        self.last_end = end
+        if not sequential:
+            self.streak = 0
+            self.clear()
+            return sync(self.loop, self.fetcher, start, end)
+        self.streak += 1
+
+        parts = []
+        pos = start
+        while pos < end and pos in self.blocks:
+            block_end, future = self.blocks.pop(pos)
+            data = future.result()
+            if block_end > end:
+                # Put the unread tail of the block back for the next call
+                rest = concurrent.futures.Future()
+                rest.set_result(data[end - pos :])
+                self.blocks[end] = (block_end, rest)
+                self.blocks.move_to_end(end, last=False)
+                data = data[: end - pos]
+            parts.append(data)
+            pos += len(data)
+        if pos < end:
+            # The reader outran the prefetched window
+            self.clear()
+            parts.append(sync(self.loop, self.fetcher, pos, end))
+        self._schedule(end)
+        return b"".join(parts)
+
+
 class AzureBlobFile(AbstractBufferedFile):
     """ File-like operations on Azure Blobs """
 
@@ -1560,6 +2069,7 @@ class AzureBlobFile(AbstractBufferedFile):
         cache_type: str = "bytes",
         cache_options: dict = {},
         metadata=None,
+        prefetch_blocks: int = 8,
         **kwargs,
     ):
         """
@@ -1591,6 +2101,11 @@ class AzureBlobFile(AbstractBufferedFile):
             Additional options passed to the constructor for the cache specified
             by `cache_type`.
 
+        prefetch_blocks: int
+            Maximum number of blocks to download in the background once the file
+            is being read sequentially. The window starts at one block and grows
+            with the sequential streak. Set to 0 to disable prefetching.
+
         kwargs: dict
             Passed to AbstractBufferedFile
         """
@@ -1605,9 +2120,11 @@ class AzureBlobFile(AbstractBufferedFile):
         self.blob = blob
         self.block_size = block_size
         self.container_client = (
-            fs.service_client.get_container_client(self.container_name)
-            or self.connect_client()
+            fs._get_container_client(self.container_name) or self.connect_client()
         )
+        # Every block read or written goes through this client, so build it once
+        # rather than letting each request create its own
+        self.blob_client = self.container_client.get_blob_client(blob=self.blob)
         self.blocksize = (
             self.DEFAULT_BLOCK_SIZE if block_size in ["default", None] else block_size
         )
@@ -1629,6 +2146,7 @@ class AzureBlobFile(AbstractBufferedFile):
             )
             cache_options["trim"] = kwargs.pop("trim")
         self.metadata = None
+        self.prefetcher = None
         self.kwargs = kwargs
 
         if self.mode not in {"ab", "rb", "wb"}:
@@ -1637,12 +2155,30 @@ class AzureBlobFile(AbstractBufferedFile):
             if not hasattr(self, "details"):
                 self.details = self.fs.info(self.path)
             self.size = self.details["size"]
-            self.cache = caches[cache_type](
-                self.blocksize, self._fetch_range, self.size, **cache_options
-            )
-            self.metadata = sync(
-                self.loop, get_blob_metadata, self.container_client, self.blob
-            )
+            if prefetch_blocks and self.size is not None and self.size > self.blocksize:
+                self.prefetcher = BackgroundPrefetcher(
+                    self._async_fetch_range,
+                    self.loop,
+                    self.blocksize,
+                    self.size,
+                    nblocks=prefetch_blocks,
+                )
+            if self.size is not None and 0 < self.size <= self.blocksize:
+                # The whole blob fits in one block, so download it once here
+                # and serve every read from memory
+                self.cache = caches["all"](self.blocksize, self._fetch_range, self.size)
+            else:
+                self.cache = caches[cache_type](
+                    self.blocksize, self._fetch_range, self.size, **cache_options
+                )
+            # The listing that info() is served from already includes the
+            # metadata, so only fetch the blob properties if it is missing
+            if "metadata" in self.details:
+                self.metadata = self.details["metadata"]
+            else:
+                self.metadata = sync(
+                    self.loop, get_blob_metadata, self.container_client, self.blob
+                )
 
         else:
             self.metadata = metadata or {"is_directory": "false"}
@@ -1653,6 +2189,8 @@ class AzureBlobFile(AbstractBufferedFile):
 
     def close(self):
         """Close file and azure client."""
+        if self.prefetcher is not None:
+            self.prefetcher.clear()
         asyncio.run_coroutine_threadsafe(close_container_client(self), loop=self.loop)
         super().close()
 
@@ -1668,6 +2206,7 @@ class AzureBlobFile(AbstractBufferedFile):
             self.fs.account_url: str = (
                 f"https://{self.fs.account_name}.blob.core.windows.net"
             )
+            client_kwargs = self.fs._get_transport_kwargs()
             creds = [self.fs.sync_credential, self.fs.account_key, self.fs.credential]
             if any(creds):
                 self.container_client = [
@@ -1675,21 +2214,24 @@ class AzureBlobFile(AbstractBufferedFile):
                         account_url=self.fs.account_url,
                         credential=cred,
                         _location_mode=self.fs.location_mode,
+                        **client_kwargs,
                     ).get_container_client(self.container_name)
                     for cred in creds
                     if cred is not None
                 ][0]
             elif self.fs.connection_string is not None:
                 self.container_client = AIOBlobServiceClient.from_connection_string(
-                    conn_str=self.fs.connection_string
+                    conn_str=self.fs.connection_string, **client_kwargs
                 ).get_container_client(self.container_name)
             elif self.fs.sas_token is not None:
                 self.container_client = AIOBlobServiceClient(
-                    account_url=self.fs.account_url + self.fs.sas_token, credential=None
+                    account_url=self.fs.account_url + self.fs.sas_token,
+                    credential=None,
+                    **client_kwargs,
                 ).get_container_client(self.container_name)
             else:
                 self.container_client = AIOBlobServiceClient(
-                    account_url=self.fs.account_url
+                    account_url=self.fs.account_url, **client_kwargs
                 ).get_container_client(self.container_name)
 
         except Exception as e:
@@ -1706,16 +2248,24 @@ class AzureBlobFile(AbstractBufferedFile):
         start: int
             Start byte position to download blob from
         end: int
-            End byte position to download blob from
+            End byte position (exclusive) to download blob from
         """
-        async with self.container_client:
-            stream = await self.container_client.download_blob(
-                blob=self.blob, offset=start, length=end
-            )
-            blob = await stream.readall()
+        if end <= start:
+            return b""
+        # The container client is closed in ``close()``; closing it here would
+        # drop its pooled connections after every block.
+        stream = await self.blob_client.download_blob(offset=start, length=end - start)
+        blob = await stream.readall()
         return blob
 
-    _fetch_range = sync_wrapper(_async_fetch_range)
+    def _fetch_range(self, start: int, end: int, **kwargs):
+        """
+        Download a chunk of data specified by start and end, from the blocks
+        prefetched in the background for sequential reads when available
+        """
+        if self.prefetcher is not None:
+            return self.prefetcher.fetch(start, end)
+        return sync(self.loop, self._async_fetch_range, start, end, **kwargs)
 
     async def _reinitiate_async_upload(self, **kwargs):
         pass
@@ -1723,6 +2273,8 @@ class AzureBlobFile(AbstractBufferedFile):
     async def _async_initiate_upload(self, **kwargs):
         """Prepare a remote file upload"""
         self._block_list = []
+        self._pending_blocks = []
+        self._upload_error = None
         if self.mode == "wb":
             try:
                 await self.container_client.delete_blob(self.blob)
@@ -1733,12 +2285,13 @@ class AzureBlobFile(AbstractBufferedFile):
 
         elif self.mode == "ab":
             if not await self.fs._exists(self.path):
-                async with self.container_client.get_blob_client(blob=self.blob) as bc:
+                async with self.blob_client as bc:
                     await bc.create_append_blob(metadata=self.metadata)
         else:
             raise ValueError(
                 "File operation modes other than wb are not yet supported for writing"
             )
+        self.fs.invalidate_for_write(self.path)
 
     _initiate_upload = sync_wrapper(_async_initiate_upload)
 
@@ -1753,49 +2306,45 @@ class AzureBlobFile(AbstractBufferedFile):
             self.autocommit is True.
 
         """
+        if self._upload_error is not None:
+            # A block failed to stage, so the blob must not be committed
+            raise RuntimeError(
+                f"Upload of {self.path} failed: {self._upload_error}"
+            ) from self._upload_error
+        # getvalue() returns immutable bytes, sharing the BytesIO's memory
+        # instead of copying it, so blocks staged in the background can hold on
+        # to them whatever happens to the buffer afterwards
         data = self.buffer.getvalue()
         length = len(data)
         block_id = len(self._block_list)
         block_id = f"{block_id:07d}"
         if self.mode == "wb":
-            try:
-                async with self.container_client.get_blob_client(blob=self.blob) as bc:
-                    await bc.stage_block(
-                        block_id=block_id, data=data, length=length,
-                    )
+            if length:
+                # Bound the number of blocks held in memory while uploading
+                while len(self._pending_blocks) >= self.fs.max_concurrency:
+                    await self._wait_for_block(self._pending_blocks.pop(0))
+                # Stage the block in the background, so that the next block can
+                # be buffered while this one is uploading
                 self._block_list.append(block_id)
-
-                if final:
-                    block_list = [BlobBlock(_id) for _id in self._block_list]
-                    async with self.container_client.get_blob_client(
-                        blob=self.blob
-                    ) as bc:
+                self._pending_blocks.append(
+                    asyncio.ensure_future(self._async_stage_block(block_id, data))
+                )
+            if final:
+                # Wait for all of the blocks before committing
+                while self._pending_blocks:
+                    await self._wait_for_block(self._pending_blocks.pop(0))
+                async with self.blob_client as bc:
+                    if self._block_list:
+                        block_list = [BlobBlock(_id) for _id in self._block_list]
                         await bc.commit_block_list(
                             block_list=block_list, metadata=self.metadata
                         )
-            except Exception as e:
-                # This step handles the situation where data="" and length=0
-                # which is throws an InvalidHeader error from Azure, so instead
-                # of staging a block, we directly upload the empty blob
-                # This isn't actually tested, since Azureite behaves differently.
-                if block_id == "0000000" and length == 0 and final:
-                    async with self.container_client.get_blob_client(
-                        blob=self.blob
-                    ) as bc:
+                    else:
+                        # Staging an empty block throws an InvalidHeader error
+                        # from Azure, so upload the empty blob directly
                         await bc.upload_blob(data=data, metadata=self.metadata)
-                elif length == 0 and final:
-                    # just finalize
-                    block_list = [BlobBlock(_id) for _id in self._block_list]
-                    async with self.container_client.get_blob_client(
-                        blob=self.blob
-                    ) as bc:
-                        await bc.commit_block_list(
-                            block_list=block_list, metadata=self.metadata
-                        )
-                else:
-                    raise RuntimeError(f"Failed to upload block{e}!") from e
         elif self.mode == "ab":
-            async with self.container_client.get_blob_client(blob=self.blob) as bc:
+            async with self.blob_client as bc:
                 await bc.upload_blob(
                     data=data,
                     length=length,
@@ -1806,9 +2355,27 @@ class AzureBlobFile(AbstractBufferedFile):
             raise ValueError(
                 "File operation modes other than wb or ab are not yet supported for upload_chunk"
             )
+        if final:
+            self.fs.invalidate_for_write(self.path)
 
     _upload_chunk = sync_wrapper(_async_upload_chunk)
 
+    async def _async_stage_block(self, block_id: str, data: bytes):
+        """Upload one uncommitted block of a block blob"""
+        async with self.blob_client as bc:
+            await bc.stage_block(block_id=block_id, data=data, length=len(data))
+
+    async def _wait_for_block(self, task):
+        """Wait for a block staged in the background to finish uploading"""
+        try:
+            await task
+        except Exception as e:
+            for pending in self._pending_blocks:
+                pending.cancel()
+            self._pending_blocks = []
+            self._upload_error = e
+            raise RuntimeError(f"Failed to upload block{e}!") from e
+
     def __del__(self):
         try:
             if not self.closed:
@@ -1,5 +1,7 @@
 import datetime
+import pickle
 import dask.dataframe as dd
+from fsspec.caching import AllBytes
 from fsspec.implementations.local import LocalFileSystem
 import numpy as np
 import pandas as pd
@@ -570,6 +572,36 @@ def test_open_file(storage, mocker):
     close.assert_called_once()
 
 
+def test_open_small_file_in_memory(storage, mocker):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+
+    # the cache keeps the fetcher it was built with, so spy before opening
+    fetch = mocker.spy(AzureBlobFile, "_fetch_range")
+    with fs.open("/data/root/rfile.txt") as f:
+        # the whole blob was downloaded when the file was opened
+        assert isinstance(f.cache, AllBytes)
+        assert f.read(4) == b"0123"
+        f.seek(8)
+        assert f.read() == b"89"
+    assert fetch.call_count == 1
+    assert fetch.call_args[0][-2:] == (0, 10)
+
+
+def test_fetch_range(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+
+    with fs.open("/data/top_file.txt") as f:
+        # only the requested bytes are downloaded
+        assert f._fetch_range(0, 4) == b"0123"
+        assert f._fetch_range(3, 7) == b"3456"
+        assert f._fetch_range(8, 20) == b"89"
+        assert f._fetch_range(5, 5) == b""
+
+
 # def test_open_context_manager(storage, mocker):
 #     """
 #     Memory profiling shows this is working, but its failing the test
@@ -615,6 +647,72 @@ def test_rm_recursive(storage):
         fs.ls("data/root/c")
 
 
+def test_rm_many(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    fs.mkdir("rmdir")
+    paths = [f"rmdir/file{i}.txt" for i in range(300)]
+    fs.pipe({path: b"0123456789" for path in paths})
+    assert len(fs.ls("rmdir")) == 300
+
+    # more blobs than fit in a single batch request
+    fs.rm(paths)
+    assert not any(fs.exists(path) for path in paths[::50])
+    fs.rmdir("rmdir")
+
+
+def test_rm_batch_errors(storage, monkeypatch):
+    from azure.core.exceptions import HttpResponseError
+
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    removed = []
+
+    async def _rm_file(path, **kwargs):
+        removed.append(path)
+
+    def failing_batch(status_code):
+        async def _batch_chunks(container_name, blobs, operation):
+            error = HttpResponseError(message="batch failed")
+            error.status_code = status_code
+            raise error
+
+        return _batch_chunks
+
+    monkeypatch.setattr(fs, "_rm_file", _rm_file)
+
+    # Only an unsupported batch request falls back to one request per blob
+    monkeypatch.setattr(fs, "_batch_chunks", failing_batch(501))
+    fs.rm(["data/top_file.txt", "data/root/rfile.txt"])
+    assert removed == ["data/top_file.txt", "data/root/rfile.txt"]
+
+    removed.clear()
+    monkeypatch.setattr(fs, "_batch_chunks", failing_batch(403))
+    with pytest.raises(HttpResponseError):
+        fs.rm(["data/top_file.txt", "data/root/rfile.txt"])
+    assert not removed
+
+
+def test_set_tier(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    paths = [f"data/tier/file{i}.txt" for i in range(3)]
+    fs.pipe({path: b"0123456789" for path in paths})
+
+    fs.set_tier(paths, "Cool")
+    for path in paths:
+        blob = storage.get_blob_client("data", path.split("/", 1)[1])
+        assert blob.get_blob_properties().blob_tier == "Cool"
+
+    fs.set_tier(paths[0], "Hot")
+    blob = storage.get_blob_client("data", "tier/file0.txt")
+    assert blob.get_blob_properties().blob_tier == "Hot"
+    fs.rm("data/tier", recursive=True)
+
+
 def test_mkdir(storage):
     fs = AzureBlobFileSystem(
         account_name=storage.account_name, connection_string=CONN_STR,
@@ -863,6 +961,70 @@ def test_large_blob(storage):
         assert local_blob.stat().st_size == blob_size
 
 
+def test_write_many_blocks(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    fs.mkdir("blockdir")
+    data = bytes(range(256)) * 40
+
+    # blocks are staged in the background and committed in order
+    with fs.open("blockdir/blocks.bin", "wb", block_size=1000) as f:
+        for i in range(0, len(data), 700):
+            f.write(data[i : i + 700])
+    assert fs.cat("blockdir/blocks.bin") == data
+
+    with fs.open("blockdir/empty.bin", "wb") as f:
+        pass
+    assert fs.cat("blockdir/empty.bin") == b""
+    fs.rm("blockdir", recursive=True)
+
+
+def test_invalid_max_concurrency(storage):
+    for max_concurrency in [0, -1]:
+        with pytest.raises(ValueError, match="max_concurrency"):
+            AzureBlobFileSystem(
+                account_name=storage.account_name,
+                connection_string=CONN_STR,
+                max_concurrency=max_concurrency,
+            )
+
+
+def test_write_block_failure(storage):
+    import asyncio
+
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR, max_concurrency=2
+    )
+    f = fs.open("data/failed.bin", "wb", block_size=1000)
+    stage_block = f._async_stage_block
+    in_flight = []
+    peak = []
+
+    async def _async_stage_block(block_id, data):
+        in_flight.append(block_id)
+        peak.append(len(in_flight))
+        try:
+            await asyncio.sleep(0.01)
+            if block_id == "0000003":
+                raise ValueError("stage failed")
+            await stage_block(block_id, data)
+        finally:
+            in_flight.remove(block_id)
+
+    f._async_stage_block = _async_stage_block
+    with pytest.raises(RuntimeError, match="stage failed"):
+        for _ in range(10):
+            f.write(b"x" * 1000)
+    assert max(peak) <= 2
+
+    # the failed upload is not committed when the file is closed
+    with pytest.raises(RuntimeError, match="stage failed"):
+        f.close()
+    f.close()
+    assert not fs.exists("data/failed.bin")
+
+
 def test_dask_parquet(storage):
     fs = AzureBlobFileSystem(
         account_name=storage.account_name, connection_string=CONN_STR
@@ -1128,6 +1290,190 @@ def test_cat(storage):
     fs.rm("catdir/catfile.txt")
 
 
+def test_write_invalidates_listing(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    fs.mkdir("cachedir")
+    fs.pipe("cachedir/first.txt", b"0123456789")
+    assert fs.ls("cachedir") == ["cachedir/first.txt"]
+    assert "cachedir" in fs.dircache
+
+    with fs.open("cachedir/second.txt", "wb") as f:
+        f.write(b"0123456789")
+    assert "cachedir" not in fs.dircache
+    assert fs.ls("cachedir") == ["cachedir/first.txt", "cachedir/second.txt"]
+
+    fs.cp_file("cachedir/first.txt", "cachedir/third.txt")
+    assert fs.info("cachedir/third.txt")["size"] == 10
+    fs.rm("cachedir", recursive=True)
+
+
+def test_bulk_info(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    paths = ["data/top_file.txt", "abfs://data/root/rfile.txt", "data/root", "data"]
+    infos = fs.bulk_info(paths)
+    assert list(infos) == paths
+    for path in paths:
+        assert infos[path] == fs.info(path)
+    assert {"data", "data/root"} <= set(fs.dircache)
+    assert fs.sizes(paths[:2]) == [10, 10]
+
+    with pytest.raises(FileNotFoundError):
+        fs.bulk_info(["data/top_file.txt", "data/not_a_file.txt"])
+
+
+def test_bulk_info_bounded(storage, monkeypatch):
+    import asyncio
+
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR, max_concurrency=2
+    )
+    in_flight = []
+    peak = []
+
+    async def _ls(path, **kwargs):
+        return []
+
+    async def _info(path, **kwargs):
+        in_flight.append(path)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(path)
+        return {"name": path, "size": None, "type": "directory"}
+
+    monkeypatch.setattr(fs, "_ls", _ls)
+    monkeypatch.setattr(fs, "_info", _info)
+    paths = [f"container{i}" for i in range(10)]
+    assert list(fs.bulk_info(paths)) == paths
+    assert max(peak) == 2
+
+
+def test_pickle_filesystem(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    fs.ls("data")
+    blob = pickle.dumps(fs)
+    fs.clear_instance_cache()
+
+    fs2 = pickle.loads(blob)
+    assert fs2 is not fs
+    assert fs2.service_client is not fs.service_client
+    assert not fs2.dircache
+    assert fs2.cat("data/top_file.txt") == b"0123456789"
+
+
+def test_invalidate_for_write(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    fs.invalidate_cache()
+    fs.dircache["/"] = [{"name": "data/", "type": "directory", "size": 0}]
+    fs.dircache["data"] = [{"name": "data/root/", "type": "directory", "size": 0}]
+    fs.dircache["data/root"] = [{"name": "data/root/a/", "type": "directory"}]
+    fs.dircache["data/root/a"] = [{"name": "data/root/a/file.txt", "type": "file"}]
+    fs.dircache["data/other"] = [{"name": "data/other/x.txt", "type": "file"}]
+
+    # Only the parent listing changes when a file is added to a cached directory
+    fs.invalidate_for_write("data/root/a/new.txt")
+    assert "data/root/a" not in fs.dircache
+    assert {"/", "data", "data/root", "data/other"} <= set(fs.dircache)
+
+    # A new virtual directory also changes the listing of its ancestors
+    fs.invalidate_for_write("abfs://data/root/b/c/new.txt")
+    assert "data/root" not in fs.dircache
+    assert {"/", "data", "data/other"} <= set(fs.dircache)
+
+    # Writing to a directory drops the listings below it
+    fs.dircache["data/other/sub"] = []
+    fs.invalidate_for_write("data/other")
+    assert "data/other" not in fs.dircache
+    assert "data/other/sub" not in fs.dircache
+    assert "data" not in fs.dircache
+    assert "/" in fs.dircache
+
+    # A new container changes the listing of the root
+    fs.dircache["data"] = []
+    fs.invalidate_for_write("newcontainer/file.txt")
+    assert "/" not in fs.dircache
+    assert "data" in fs.dircache
+
+    # Deleting the last blob of a virtual directory removes it from the
+    # listings of its ancestors too
+    fs.dircache["/"] = [{"name": "data/", "type": "directory", "size": 0}]
+    fs.dircache["data"] = [{"name": "data/dir/", "type": "directory", "size": 0}]
+    fs.dircache["data/dir"] = [{"name": "data/dir/only.txt", "type": "file"}]
+    fs.dircache["data/other"] = []
+    fs.invalidate_for_write(["data/dir/only.txt"], delete=True)
+    assert set(fs.dircache) == {"data/other"}
+    fs.invalidate_cache()
+
+
+def test_invalidate_for_write_expired_listings(storage):
+    import time
+
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name,
+        connection_string=CONN_STR,
+        listings_expiry_time=0.01,
+    )
+    fs.ls("data")
+    fs.ls("data/root")
+    time.sleep(0.05)
+    fs.pipe("data/root/expired.txt", b"0123456789")
+    assert "data/root/expired.txt" in fs.ls("data/root")
+    fs.rm("data/root/expired.txt")
+    assert "data/root/expired.txt" not in fs.ls("data/root")
+
+
+def test_cat_file_ranges(storage):
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    assert fs.cat_file("data/top_file.txt") == b"0123456789"
+    assert fs.cat_file("data/top_file.txt", start=2, end=5) == b"234"
+    assert fs.cat_file("data/top_file.txt", start=7) == b"789"
+    assert fs.cat_ranges(
+        ["data/top_file.txt", "data/root/rfile.txt", "data/top_file.txt"],
+        [0, 4, 9],
+        [2, 8, 10],
+    ) == [b"01", b"4567", b"9"]
+    assert fs.cat_file("data/top_file.txt", start=10) == b""
+    assert fs.cat_file("data/top_file.txt", start=12, end=20) == b""
+    with pytest.raises(FileNotFoundError):
+        fs.cat_file("data/not-a-file.txt")
+
+    fs.pipe("data/empty_file.txt", b"")
+    assert fs.cat_file("data/empty_file.txt") == b""
+    assert fs.cat_file("data/empty_file.txt", start=0) == b""
+    assert fs.cat("data/empty_file.txt") == b""
+    fs.rm("data/empty_file.txt")
+
+
+def test_cat_concurrent(storage):
+    from adlfs.spec import MIN_CHUNK_SIZE_FOR_CONCURRENCY
+
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name, connection_string=CONN_STR
+    )
+    assert fs.cat(["data/top_file.txt", "data/root/rfile.txt"]) == {
+        "data/top_file.txt": b"0123456789",
+        "data/root/rfile.txt": b"0123456789",
+    }
+    assert fs.cat("data/root/*.txt") == {"data/root/rfile.txt": b"0123456789"}
+
+    # a range spanning several chunks is downloaded concurrently and reassembled
+    fs.mkdir("catdir")
+    size = 2 * MIN_CHUNK_SIZE_FOR_CONCURRENCY + 100
+    data = bytes(range(256)) * (size // 256) + b"0" * (size % 256)
+    fs.pipe("catdir/large.bin", data)
+    assert fs.cat_file("catdir/large.bin", start=50, end=size) == data[50:]
+    fs.rm("catdir/large.bin")
+
+
 def test_url(storage):
     fs = AzureBlobFileSystem(
         account_name=storage.account_name, connection_string=CONN_STR, account_key=KEY
@@ -1172,3 +1518,95 @@ def test_exists(storage):
     assert not fs.exists("non-existent-container/")
     assert fs.exists("")
     assert not fs.exists("data/not-a-key")
+
+
+def test_request_session_is_shared(storage):
+    session = object()
+    fs = AzureBlobFileSystem(
+        account_name=storage.account_name,
+        connection_string=CONN_STR,
+        request_session=session,
+        skip_instance_cache=True,
+    )
+    assert fs.service_client._pipeline._transport.session is session
+    cc = fs.service_client.get_container_client("data")
+    assert cc._pipeline._transport._transport.session is session
+
+
+def test_background_prefetcher(storage):
+    from fsspec.asyn import get_loop
+    from adlfs.spec import BackgroundPrefetcher
+
+    data = bytes(range(256)) * 4
+    calls = []
+
+    async def fetcher(start, end):
+        calls.append((start, end))
+        return data[start:end]
+
+    prefetcher = BackgroundPrefetcher(fetcher, get_loop(), 100, len(data), nblocks=2)
+
+    # the first read is not part of a streak, so nothing is prefetched
+    assert prefetcher.fetch(0, 50) == data[0:50]
+    assert calls == [(0, 50)]
+
+    # a single contiguous read is not enough to start prefetching
+    assert prefetcher.fetch(50, 120) == data[50:120]
+    assert not prefetcher.blocks
+
+    # a longer streak prefetches one block, then a window that grows
+    assert prefetcher.fetch(120, 150) == data[120:150]
+    assert list(prefetcher.blocks) == [150]
+    assert prefetcher.fetch(150, 300) == data[150:300]
+    assert list(prefetcher.blocks) == [300, 400]
+    assert prefetcher.fetch(300, 1100) == data[300:]
+
+    # a seek drops the window
+    calls.clear()
+    assert prefetcher.fetch(10, 20) == data[10:20]
+    assert calls == [(10, 20)]
+    assert not prefetcher.blocks
+
+
+def test_datalake_token_cache(monkeypatch):
+    import adlfs.spec
+    from adlfs import AzureDatalakeFileSystem
+
+    tokens = []
+
+    def auth(tenant_id, client_id, client_secret):
+        if client_secret == "bad":
+            raise ValueError("authentication failed")
+        tokens.append(object())
+        return tokens[-1]
+
+    class FakeDLFileSystem:
+        def __init__(self, token, store_name):
+            self.token = token
+
+    monkeypatch.setattr(adlfs.spec, "_TOKEN_CACHE", {})
+    # lib.auth is gone from azure-datalake-store releases newer than the pinned <0.1
+    monkeypatch.setattr(adlfs.spec.lib, "auth", auth, raising=False)
+    monkeypatch.setattr(adlfs.spec, "AzureDLFileSystem", FakeDLFileSystem)
+
+    # instances with the same credentials share one token
+    fs1 = AzureDatalakeFileSystem("tenant", "client", "secret", "store1")
+    fs2 = AzureDatalakeFileSystem("tenant", "client", "secret", "store2")
+    assert len(tokens) == 1
+    assert fs1.azure_fs.token is fs2.azure_fs.token
+
+    # a different secret authenticates again
+    fs3 = AzureDatalakeFileSystem("tenant", "client", "other", "store1")
+    assert len(tokens) == 2
+    assert fs3.azure_fs.token is not fs1.azure_fs.token
+
+    # a failed authentication is not cached
+    with pytest.raises(ValueError):
+        AzureDatalakeFileSystem("tenant", "client", "bad", "store1")
+    assert len(adlfs.spec._TOKEN_CACHE) == 2
+    monkeypatch.setattr(
+        adlfs.spec.lib, "auth", lambda **kwargs: tokens.append(object()) or tokens[-1]
+    )
+    fs4 = AzureDatalakeFileSystem("tenant", "client", "bad", "store1")
+    assert len(tokens) == 3
+    assert fs4.azure_fs.token is tokens[-1]